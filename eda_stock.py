@@ -1,8 +1,8 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 
-# Load stock data from CSV
-df = pd.read_csv("infosys_stock_data.csv", index_col=0, parse_dates=True)
+# Load stock data from Parquet (dtypes and DatetimeIndex are stored, file is memory-mapped)
+df = pd.read_parquet("infosys_stock_data.parquet", engine="pyarrow", memory_map=True)
 
 # Display first 5 rows
 print("\n--- First 5 Rows ---")
@@ -1,33 +1,251 @@
 # stock_app.py
 import io
-import tempfile
-import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from fpdf import FPDF
 
-import yfinance as yf
+import numpy as np
+import yfinance_cache as yfc
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import streamlit as st
 
+from utils._njit import njit
+
 # -------------------------
 # Page config
 # -------------------------
 st.set_page_config(layout="wide", page_title="Stock Data Viewer (Refresh & Export)")
 
+# PNG at scale 1 for the PDF chart (a quarter of the pixels of scale=2)
+pio.defaults.default_format = "png"
+pio.defaults.default_scale = 1
+
+# most points per Close-chart trace sent to the browser (above 10y of daily bars)
+MAX_CHART_POINTS = 3000
+
+# -------------------------
+# Helper: chart image export
+# -------------------------
+def _warm_kaleido():
+    # one-shot export first: it fails fast when kaleido or Chrome is missing, whereas a
+    # persistent server started without Chrome would leave every later export hanging
+    try:
+        go.Figure().to_image()
+    except Exception:
+        return
+    import kaleido
+    start = getattr(kaleido, "start_sync_server", None)
+    if start is not None:  # kaleido v1; v0 already keeps its process alive between calls
+        start(silence_warnings=True)
+
+@st.cache_resource(show_spinner=False)
+def export_pool() -> ThreadPoolExecutor:
+    """Single worker shared by all sessions for PNG exports, with Chrome warmed up first."""
+    pool = ThreadPoolExecutor(max_workers=1)
+    pool.submit(_warm_kaleido)
+    return pool
+
+# start warming up in the background on the first run of this process
+export_pool()
+
+# seconds the PDF report waits for the chart PNG before going without it
+PNG_EXPORT_TIMEOUT = 30
+
 # -------------------------
 # Helper: cached data fetch
 # -------------------------
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
 @st.cache_data(show_spinner=False)
 def get_stock_data(ticker: str, period: str = "5y"):
-    """Download stock data via yfinance (cached)."""
-    df = yf.download(ticker, period=period, progress=False)
-    # If yfinance returns MultiIndex columns, keep only first level
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = [c[0] for c in df.columns]
+    """Load stock data via yfinance-cache (persisted on disk, only new bars are fetched)."""
+    try:
+        df = yfc.Ticker(ticker).history(period=period, actions=False)
+    except Exception:
+        # unknown symbol / nothing on Yahoo: fall through to the "No data found" warning
+        return pd.DataFrame()
+    if df is None or df.empty:
+        return pd.DataFrame()
+    # same columns yf.download returned; yfc also adds bookkeeping ones (Final?, Repaired?, FetchDate)
+    df = df[[c for c in PRICE_COLUMNS if c in df.columns]]
+    # yfc returns exchange-local timestamps; drop the tz (like yf.download) so Excel export works
+    df.index = df.index.tz_localize(None)
     return df
 
+# -------------------------
+# Helper: indicators
+# -------------------------
+@njit(cache=True)
+def _all_rollings(close, bb_window=20, fast=50, slow=200, k=2.0):
+    # one pass for the Bollinger mean/std and both MAs: a running sum per window
+    # (plus a sum of squares for the band) instead of one rolling pass per column
+    n = close.shape[0]
+    bb_ma = np.full(n, np.nan)
+    upper = np.full(n, np.nan)
+    lower = np.full(n, np.nan)
+    ma_fast = np.full(n, np.nan)
+    ma_slow = np.full(n, np.nan)
+    s_bb = 0.0
+    s2_bb = 0.0
+    s_fast = 0.0
+    s_slow = 0.0
+    # NaN closes stay out of the sums; a window is NaN while it still contains one
+    # (rolling(w) needs w valid prices), so a single gap can't poison every later value
+    nan_bb = 0
+    nan_fast = 0
+    nan_slow = 0
+    # np.float64() rather than float(): numba keeps float32 arithmetic for float(float32)
+    for i in range(n):
+        x = np.float64(close[i])
+        if x == x:
+            s_bb += x
+            s2_bb += x * x
+            s_fast += x
+            s_slow += x
+        else:
+            nan_bb += 1
+            nan_fast += 1
+            nan_slow += 1
+        if i >= bb_window:
+            old = np.float64(close[i - bb_window])
+            if old == old:
+                s_bb -= old
+                s2_bb -= old * old
+            else:
+                nan_bb -= 1
+        if i >= fast:
+            old = np.float64(close[i - fast])
+            if old == old:
+                s_fast -= old
+            else:
+                nan_fast -= 1
+        if i >= slow:
+            old = np.float64(close[i - slow])
+            if old == old:
+                s_slow -= old
+            else:
+                nan_slow -= 1
+        if i >= bb_window - 1 and nan_bb == 0:
+            mean = s_bb / bb_window
+            # sample variance (ddof=1), same as rolling().std()
+            var = (s2_bb - s_bb * mean) / (bb_window - 1) if bb_window > 1 else 0.0
+            std = np.sqrt(max(var, 0.0))
+            bb_ma[i] = mean
+            upper[i] = mean + k * std
+            lower[i] = mean - k * std
+        if i >= fast - 1 and nan_fast == 0:
+            ma_fast[i] = s_fast / fast
+        if i >= slow - 1 and nan_slow == 0:
+            ma_slow[i] = s_slow / slow
+    return bb_ma, upper, lower, ma_fast, ma_slow
+
+def rolling_indicators(df, bb_window=20, no_of_std=2, fast=50, slow=200):
+    """Bollinger (MA, upper, lower) and the fast/slow moving averages of Close."""
+    arrays = _all_rollings(df["Close"].to_numpy(), bb_window, fast, slow, float(no_of_std))
+    return tuple(pd.Series(a, index=df.index) for a in arrays)
+
+@njit(cache=True)
+def _macd_loop(close, a_s, a_l, a_sig):
+    # single pass of the three EMA recurrences (same as ewm(adjust=False))
+    n = close.shape[0]
+    macd_line = np.full(n, np.nan)
+    signal_line = np.full(n, np.nan)
+    hist = np.full(n, np.nan)
+    # float64 state even when close is float32; NaN until the first valid price
+    e1 = np.nan
+    e2 = np.nan
+    sig = np.nan
+    # weight of the old state: a NaN input skips the update and keeps the state, but the
+    # weight keeps decaying so the next price lands exactly where ewm(adjust=False) puts it
+    w1 = 1.0
+    w2 = 1.0
+    for i in range(n):
+        x = np.float64(close[i])
+        if e1 == e1:
+            w1 *= 1.0 - a_s
+            w2 *= 1.0 - a_l
+            if x == x:
+                e1 = (w1 * e1 + a_s * x) / (w1 + a_s)
+                e2 = (w2 * e2 + a_l * x) / (w2 + a_l)
+                w1 = 1.0
+                w2 = 1.0
+        elif x == x:
+            e1 = x
+            e2 = x
+        if e1 != e1:
+            continue
+        m = e1 - e2
+        # the MACD line has no gaps once started, so the signal EMA is the plain recurrence
+        sig = m if sig != sig else ((1.0 - a_sig) * sig + a_sig * m) / ((1.0 - a_sig) + a_sig)
+        macd_line[i] = m
+        signal_line[i] = sig
+        hist[i] = m - sig
+    return macd_line, signal_line, hist
+
+def macd(df, short=12, long=26, signal=9):
+    macd_line, signal_line, hist = _macd_loop(
+        df["Close"].to_numpy(), 2 / (short + 1), 2 / (long + 1), 2 / (signal + 1)
+    )
+    return (pd.Series(macd_line, index=df.index), pd.Series(signal_line, index=df.index),
+            pd.Series(hist, index=df.index))
+
+@njit(cache=True)
+def _max_abs_bins(values, n_bins):
+    # index of the largest-|value| point in each of n_bins equal slices (one bar per pixel column)
+    n = values.shape[0]
+    keep = np.empty(n_bins, dtype=np.int64)
+    for b in range(n_bins):
+        lo = b * n // n_bins
+        hi = (b + 1) * n // n_bins
+        best = lo
+        for i in range(lo + 1, hi):
+            # values[best] != values[best]: a leading NaN (no price yet) loses to any number
+            if abs(values[i]) > abs(values[best]) or values[best] != values[best]:
+                best = i
+        keep[b] = best
+    return keep
+
+# every (ticker, start, end) triple is a new entry: bound the cache so date-slider
+# browsing can't grow server memory without limit
+@st.cache_data(show_spinner=False, max_entries=32, ttl=pd.Timedelta(hours=1))
+def compute_indicators(ticker: str, start, end, period: str) -> pd.DataFrame:
+    """Slice the cached data to [start, end] and add MA/Bollinger/MACD columns (cached)."""
+    raw = get_stock_data(ticker, period=period)
+    # binary search on the sorted index instead of a per-row date mask
+    lo = raw.index.searchsorted(pd.Timestamp(start))
+    hi = raw.index.searchsorted(pd.Timestamp(end) + pd.Timedelta(days=1))
+    df = raw.iloc[lo:hi]
+    if df.empty:
+        return df
+    bb_ma, bb_upper, bb_lower, ma50, ma200 = rolling_indicators(df)
+    macd_line, signal_line, hist = macd(df)
+    # assign() returns a new frame, so the cached raw data is never mutated
+    return df.assign(BB_MA=bb_ma, BB_upper=bb_upper, BB_lower=bb_lower,
+                     MACD=macd_line, Signal=signal_line, Histogram=hist,
+                     MA50=ma50, MA200=ma200)
+
+# -------------------------
+# Helper: cached exports
+# -------------------------
+# Keyed on (ticker, period, start, end) instead of hashing the frame; the leading
+# underscore tells st.cache_data not to hash the DataFrame argument. Each entry holds a whole
+# file, so keep only the recent ranges.
+@st.cache_data(show_spinner=False, max_entries=16, ttl=pd.Timedelta(hours=1))
+def df_to_csv_bytes(_df: pd.DataFrame, key: tuple) -> bytes:
+    buf = io.BytesIO()
+    _df.to_csv(buf)
+    return buf.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=16, ttl=pd.Timedelta(hours=1))
+def df_to_excel_bytes(_df: pd.DataFrame, key: tuple) -> bytes:
+    towrite = io.BytesIO()
+    # xlsxwriter streams cells straight to the zip instead of building an openpyxl object tree.
+    # constant_memory is left off: pandas writes column by column, which that mode would drop.
+    with pd.ExcelWriter(towrite, engine="xlsxwriter", engine_kwargs={"options": {"strings_to_numbers": False}}) as writer:
+        _df.to_excel(writer, sheet_name="data", index=True)
+    return towrite.getvalue()
+
 # -------------------------
 # Header & quick instructions
 # -------------------------
@@ -44,22 +262,29 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("**Refresh / Real-time**")
     if st.button("🔄 Refresh Data (fetch latest)"):
-        # Clear cached data and rerun so fresh data is fetched
+        # Fetch only the bars missing from the on-disk cache, then drop the in-process copy
         try:
-            get_stock_data.clear()
+            yfc.Ticker(ticker).history(period=period, max_age=pd.Timedelta(0))
         except Exception:
-            # older versions may not have clear method, try alternative:
-            try:
-                del st.session_state["get_stock_data"]  # not typical; safe ignore
-            except Exception:
-                pass
-        if st.button("🔄 Refresh Data"):
-           st.rerun()
+            # bad symbol: the rerun below shows the "No data found" warning
+            pass
+        try:
+            get_stock_data.clear(ticker, period=period)
+        except TypeError:
+            # older Streamlit versions: clear() takes no arguments
+            get_stock_data.clear()
+        # indicators and exports are keyed on the date range, so drop them as well
+        compute_indicators.clear()
+        df_to_csv_bytes.clear()
+        df_to_excel_bytes.clear()
+        st.rerun()
 
     st.markdown("---")
     st.header("Export")
-    pdf_request = st.button("📄 Create PDF Report")
-    excel_request = st.button("📥 Prepare Excel export")
+    # one form so an export click is a single submit/rerun
+    with st.form("export_form"):
+        pdf_request = st.form_submit_button("📄 Create PDF Report")
+        excel_request = st.form_submit_button("📥 Prepare Excel export")
     st.markdown("---")
     st.caption("Use date selectors on main page to filter the data before exporting.")
 
@@ -94,33 +319,15 @@ if start_date > end_date:
     st.error("Start Date must be before or equal to End Date.")
     st.stop()
 
-# filter dataframe by date range (use index.date comparison to be robust)
-data = raw_data.loc[(raw_data.index.date >= start_date) & (raw_data.index.date <= end_date)].copy()
-
-# compute indicators on filtered data
-def bollinger_bands(df, window=20, no_of_std=2):
-    ma = df["Close"].rolling(window=window).mean()
-    std = df["Close"].rolling(window=window).std()
-    upper = ma + std * no_of_std
-    lower = ma - std * no_of_std
-    return ma, upper, lower
-
-def macd(df, short=12, long=26, signal=9):
-    exp1 = df["Close"].ewm(span=short, adjust=False).mean()
-    exp2 = df["Close"].ewm(span=long, adjust=False).mean()
-    macd_line = exp1 - exp2
-    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
-    hist = macd_line - signal_line
-    return macd_line, signal_line, hist
-
-# Add indicator columns (safe if data is small)
-if not data.empty:
-    data["BB_MA"], data["BB_upper"], data["BB_lower"] = bollinger_bands(data)
-    data["MACD"], data["Signal"], data["Histogram"] = macd(data)
+# filtered data with all indicator columns (cached on ticker/date range/period)
+data = compute_indicators(ticker, start_date, end_date, period)
 
 # Show raw data table if requested
 if show_raw:
-    st.dataframe(data, use_container_width=True, height=300)
+    # display only: float32 halves the bytes Arrow ships to the browser (exports keep float64);
+    # Volume stays integer so large counts aren't rounded
+    float_cols = data.select_dtypes("float64").columns
+    st.dataframe(data.astype(dict.fromkeys(float_cols, "float32")), use_container_width=True, height=300)
 
 # -------------------------
 # Chart controls (main page)
@@ -138,62 +345,89 @@ with controls_col:
     else:
         metrics = st.multiselect("Metrics (multi)", ["Close", "Open", "High", "Low", "Volume"], default=["Close", "Open", "High"])
 
+# PNG export of the main chart for the PDF report, started once the chart exists
+img_future = None
 with chart_col:
     st.header("Charts")
     if data.empty:
         st.warning("No data in selected date range.")
     else:
-        fig_main = None
-        # Single metric view
-        if view_type == "Single Metric":
-            if metric == "Close":
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(x=data.index, y=data["Close"], name="Close", mode="lines", line=dict(color="cyan", width=2)))
-                # MA50 & MA200 for context
-                data["MA50"] = data["Close"].rolling(50).mean()
-                data["MA200"] = data["Close"].rolling(200).mean()
-                fig.add_trace(go.Scatter(x=data.index, y=data["MA50"], name="MA50", mode="lines", line=dict(color="orange", width=1.5)))
-                fig.add_trace(go.Scatter(x=data.index, y=data["MA200"], name="MA200", mode="lines", line=dict(color="green", width=1.5)))
-                if show_bollinger:
-                    fig.add_trace(go.Scatter(x=data.index, y=data["BB_upper"], name="BB Upper", mode="lines", line=dict(color="magenta", dash="dash", width=1)))
-                    fig.add_trace(go.Scatter(x=data.index, y=data["BB_lower"], name="BB Lower", mode="lines", line=dict(color="magenta", dash="dash", width=1)))
-                    fig.add_trace(go.Scatter(x=data.index, y=data["BB_MA"], name="BB MA (20)", mode="lines", line=dict(color="orange", width=1)))
-                fig.update_layout(title=f"{ticker} — Close", template="plotly_dark", height=520, legend=dict(orientation="h"))
-                st.plotly_chart(fig, use_container_width=True)
-                fig_main = fig
-                # Show Bollinger explanation only when toggled
-                if show_bollinger:
-                    st.markdown(
-                        "- **Bollinger Bands:** middle=20-day MA, upper/lower = ±2 std dev.\n"
-                        "- Bands widen when volatility is high and contract when low.\n"
-                        "- Price near upper band may indicate overbought; near lower band may indicate oversold."
-                    )
+        # Build the main figure only when its inputs change; reruns triggered by other widgets
+        # (MACD toggle, raw table, export buttons) reuse the one kept in session_state
+        metric_key = metric if view_type == "Single Metric" else tuple(metrics)
+        # the data fingerprint makes every session rebuild after a Refresh (the caches are
+        # shared, the kept figure is not), not only the session that pressed the button
+        data_key = (len(data), data.index[-1], data["Close"].iat[-1])
+        fig_key = (ticker, period, start_date, end_date, view_type, metric_key, show_bollinger, data_key)
+        if st.session_state.get("fig_main_key") != fig_key:
+            # imported on first chart build rather than at startup, so the page paints sooner
+            import plotly.express as px
+            from plotly_resampler import FigureResampler
+
+            # Single metric view
+            if view_type == "Single Metric":
+                if metric == "Close":
+                    # Streamlit has no resampler callback to re-aggregate on zoom, so keep the budget above
+                    # the 10y daily bar count (~2,520; Scattergl draws that fine): daily periods are sent
+                    # at full resolution and only longer series are downsampled (MinMaxLTTB) server-side.
+                    # Trace names stay unchanged in the legend
+                    fig = FigureResampler(go.Figure(), default_n_shown_samples=MAX_CHART_POINTS,
+                                          resampled_trace_prefix_suffix=("", ""), show_mean_aggregation_size=False)
+                    fig.add_trace(go.Scattergl(name="Close", mode="lines", line=dict(color="cyan", width=2)),
+                                  hf_x=data.index, hf_y=data["Close"].values)
+                    # MA50 & MA200 for context
+                    fig.add_trace(go.Scattergl(name="MA50", mode="lines", line=dict(color="orange", width=1.5)),
+                                  hf_x=data.index, hf_y=data["MA50"].values)
+                    fig.add_trace(go.Scattergl(name="MA200", mode="lines", line=dict(color="green", width=1.5)),
+                                  hf_x=data.index, hf_y=data["MA200"].values)
+                    if show_bollinger:
+                        fig.add_trace(go.Scattergl(name="BB Upper", mode="lines", line=dict(color="magenta", dash="dash", width=1)),
+                                      hf_x=data.index, hf_y=data["BB_upper"].values)
+                        fig.add_trace(go.Scattergl(name="BB Lower", mode="lines", line=dict(color="magenta", dash="dash", width=1)),
+                                      hf_x=data.index, hf_y=data["BB_lower"].values)
+                        fig.add_trace(go.Scattergl(name="BB MA (20)", mode="lines", line=dict(color="orange", width=1)),
+                                      hf_x=data.index, hf_y=data["BB_MA"].values)
+                    fig.update_layout(title=f"{ticker} — Close", template="plotly_dark", height=520, legend=dict(orientation="h"))
+                else:
+                    fig = px.line(data, x=data.index, y=metric, title=f"{ticker} — {metric}", template="plotly_dark", height=520,
+                                  render_mode="webgl")
+
+            # Multi metric view
             else:
-                fig = px.line(data, x=data.index, y=metric, title=f"{ticker} — {metric}", template="plotly_dark", height=520)
-                st.plotly_chart(fig, use_container_width=True)
-                fig_main = fig
-
-        # Multi metric view
-        else:
-            df_plot = data.copy()
-            legend_names = {}
-            if "Volume" in metrics:
-                # scale volume for visibility
-                max_price = df_plot[["Close", "Open", "High", "Low"]].max().max()
-                df_plot["Volume_scaled"] = (df_plot["Volume"] / df_plot["Volume"].max()) * max_price
-                legend_names["Volume_scaled"] = "Volume"
-                metrics = [m if m != "Volume" else "Volume_scaled" for m in metrics]
-            fig = px.line(df_plot, x=df_plot.index, y=metrics, title=f"{ticker} — Multiple metrics", template="plotly_dark", height=520)
-            fig.for_each_trace(lambda t: t.update(name=legend_names.get(t.name, t.name)))
-            st.plotly_chart(fig, use_container_width=True)
-            fig_main = fig
+                # plot straight from the column arrays instead of copying the whole frame
+                y_cols = {m: data[m].to_numpy() for m in metrics}
+                if "Volume" in y_cols:
+                    # scale volume for visibility
+                    max_price = max(data[c].max() for c in ("Close", "Open", "High", "Low"))
+                    y_cols["Volume"] = y_cols["Volume"] * (max_price / y_cols["Volume"].max())
+                fig = px.line({"Date": data.index, **y_cols}, x="Date", y=list(y_cols), title=f"{ticker} — Multiple metrics",
+                              template="plotly_dark", height=520, render_mode="webgl")
+
+            st.session_state["fig_main"] = fig
+            st.session_state["fig_main_key"] = fig_key
+
+        fig_main = st.session_state["fig_main"]
+        st.plotly_chart(fig_main, use_container_width=True)
+        if pdf_request:
+            # start the PNG export on the worker so it overlaps with the MACD chart and CSV/Excel below
+            img_future = export_pool().submit(fig_main.to_image)
+        # Show Bollinger explanation only when toggled
+        if view_type == "Single Metric" and metric == "Close" and show_bollinger:
+            st.markdown(
+                "- **Bollinger Bands:** middle=20-day MA, upper/lower = ±2 std dev.\n"
+                "- Bands widen when volatility is high and contract when low.\n"
+                "- Price near upper band may indicate overbought; near lower band may indicate oversold."
+            )
 
         # MACD chart (separate) if requested
         if show_macd and not data.empty:
             fig_macd = go.Figure()
-            fig_macd.add_trace(go.Scatter(x=data.index, y=data["MACD"], name="MACD", line=dict(color="cyan")))
-            fig_macd.add_trace(go.Scatter(x=data.index, y=data["Signal"], name="Signal", line=dict(color="orange")))
-            fig_macd.add_trace(go.Bar(x=data.index, y=data["Histogram"], name="Histogram", marker_color="gray"))
+            fig_macd.add_trace(go.Scattergl(x=data.index, y=data["MACD"], name="MACD", line=dict(color="cyan")))
+            fig_macd.add_trace(go.Scattergl(x=data.index, y=data["Signal"], name="Signal", line=dict(color="orange")))
+            # at most ~1 bar per pixel column (chart is ~1200px wide): keep the largest |value| per bin
+            hist = data["Histogram"].to_numpy()
+            keep = _max_abs_bins(hist, min(len(hist), 1200))
+            fig_macd.add_trace(go.Bar(x=data.index[keep], y=hist[keep], name="Histogram", marker_color="gray"))
             fig_macd.update_layout(title=f"{ticker} — MACD", template="plotly_dark", height=300, legend=dict(orientation="h"))
             st.plotly_chart(fig_macd, use_container_width=True)
             # MACD explanation shown only when chart visible
@@ -209,82 +443,77 @@ st.markdown("---")
 st.header("Export / Download")
 
 # CSV download
-csv_bytes = data.to_csv().encode("utf-8")
+export_key = (ticker, period, start_date, end_date)
+csv_bytes = df_to_csv_bytes(data, export_key)
 st.download_button("Download CSV (filtered)", data=csv_bytes, file_name=f"{ticker}_filtered.csv", mime="text/csv")
 
 # Excel download (in-memory)
-def df_to_excel_bytes(df: pd.DataFrame) -> bytes:
-    towrite = io.BytesIO()
-    with pd.ExcelWriter(towrite, engine="openpyxl") as writer:
-        df.to_excel(writer, sheet_name="data", index=True)
-    return towrite.getvalue()
-
-excel_bytes = df_to_excel_bytes(data)
+excel_bytes = df_to_excel_bytes(data, export_key)
 st.download_button("Download Excel (filtered)", data=excel_bytes, file_name=f"{ticker}_filtered.xlsx",
                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
 # PDF report creation (chart image + small summary)
-def create_pdf(fig: go.Figure, df: pd.DataFrame, ticker_sym: str) -> bytes:
-    # Try to export the Plotly figure to PNG using kaleido
-    img_bytes = None
-    try:
-        img_bytes = fig.to_image(format="png", scale=2)
-    except Exception as e:
-        # fallback: None (we'll note in pdf)
-        img_bytes = None
-
-    pdf = FPDF(orientation="P", unit="mm", format="A4")
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 8, f"Stock Report — {ticker_sym}", ln=True, align="C")
-    pdf.ln(4)
-    pdf.set_font("Arial", size=10)
-    pdf.cell(0, 6, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True)
-    pdf.ln(6)
+def create_pdf(img_bytes, df: pd.DataFrame, ticker_sym: str) -> bytes:
+    # imported here so sessions that never export don't pay for reportlab at startup
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+    from reportlab.platypus import Table, TableStyle
+
+    # Build the PDF in memory: the PNG is read straight from bytes, nothing touches disk
+    buf = io.BytesIO()
+    pdf = canvas.Canvas(buf, pagesize=A4)
+    page_w, page_h = A4
+    margin = 10 * mm
+    y = page_h - 15 * mm
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawCentredString(page_w / 2, y, f"Stock Report — {ticker_sym}")
+    y -= 12 * mm
+    pdf.setFont("Helvetica", 10)
+    pdf.drawString(margin, y, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    y -= 10 * mm
 
     # Insert chart image if available
     if img_bytes is not None:
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-        tmp.write(img_bytes)
-        tmp.flush()
-        tmp.close()
         # Insert full-width image (A4 width ~ 190mm printable area)
         try:
-            pdf.image(tmp.name, x=10, y=None, w=190)
+            img = ImageReader(io.BytesIO(img_bytes))
+            img_w, img_h = img.getSize()
+            w = page_w - 2 * margin
+            h = w * img_h / img_w
+            pdf.drawImage(img, margin, y - h, width=w, height=h)
+            y -= h + 6 * mm
         except Exception:
             # if image insertion fails, just skip
             pass
-        finally:
-            os.unlink(tmp.name)
-        pdf.ln(6)
     else:
-        pdf.set_font("Arial", "I", 10)
-        pdf.multi_cell(0, 5, "Chart image not available (kaleido may be missing). The data summary follows.")
-        pdf.ln(6)
+        pdf.setFont("Helvetica-Oblique", 10)
+        pdf.drawString(margin, y, "Chart image not available (kaleido may be missing). The data summary follows.")
+        y -= 10 * mm
 
     # Add small data summary table (last 5 rows)
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(0, 8, "Data summary (last 5 rows):", ln=True)
-    pdf.set_font("Arial", size=9)
+    pdf.setFont("Helvetica-Bold", 12)
+    pdf.drawString(margin, y, "Data summary (last 5 rows):")
+    y -= 4 * mm
 
     last_rows = df.tail(5).reset_index()
-    headers = list(last_rows.columns)
-    col_w = [28] * len(headers)
-    # Header
-    for i, h in enumerate(headers):
-        pdf.cell(col_w[i], 6, str(h), border=1)
-    pdf.ln()
-    # Rows
-    for _, row in last_rows.iterrows():
-        for i, val in enumerate(row):
-            txt = str(val)
-            if len(txt) > 18:
-                txt = txt[:15] + "..."
-            pdf.cell(col_w[i], 6, txt, border=1)
-        pdf.ln()
-
-    return pdf.output(dest="S").encode("latin-1")
+    headers = [str(h) for h in last_rows.columns]
+    # plain tuples per row: no per-row Series and no object-dtype upcast of the whole frame
+    rows = [[txt[:15] + "..." if len(txt) > 18 else txt for txt in map(str, row)]
+            for row in last_rows.itertuples(index=False, name=None)]
+    table = Table([headers] + rows, colWidths=[28 * mm] * len(headers))
+    table.setStyle(TableStyle([
+        ("FONT", (0, 0), (-1, -1), "Helvetica", 9),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+    ]))
+    _, table_h = table.wrapOn(pdf, page_w - 2 * margin, y)
+    table.drawOn(pdf, margin, y - table_h)
+
+    pdf.showPage()
+    pdf.save()
+    return buf.getvalue()
 
 # Trigger export actions when buttons in the sidebar were clicked
 exported = False
@@ -295,9 +524,15 @@ if excel_request:
     exported = True
 
 if pdf_request:
-    if 'fig_main' in locals() and fig_main is not None:
+    if not data.empty and img_future is not None:
         try:
-            pdf_bytes = create_pdf(fig_main, data, ticker)
+            # Collect the chart PNG (kaleido); bounded wait so a stuck export can't hang the page
+            try:
+                img_bytes = img_future.result(timeout=PNG_EXPORT_TIMEOUT)
+            except Exception:
+                # fallback (timeout or export error): None (we'll note in pdf)
+                img_bytes = None
+            pdf_bytes = create_pdf(img_bytes, data, ticker)
             st.success("PDF report prepared — click the button below to download.")
             st.download_button("Download PDF report", data=pdf_bytes, file_name=f"{ticker}_report.pdf", mime="application/pdf")
             exported = True
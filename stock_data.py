@@ -6,7 +6,7 @@ ticker = yf.Ticker("INFY.NS")
 # Get last 1 year data
 data = ticker.history(period="5y")
 
-# Save to CSV
-data.to_csv("infosys_stock_data.csv")
+# Save to Parquet (keeps dtypes and the tz-aware index; much faster to load than CSV)
+data.to_parquet("infosys_stock_data.parquet", compression="snappy")
 
-print("Data saved to infosys_stock_data.csv")
+print("Data saved to infosys_stock_data.parquet")
@@ -0,0 +1,13 @@
+# utils/_njit.py
+"""Numba ``njit`` with a pure-Python fallback when numba is not installed."""
+try:
+    from numba import njit
+except ImportError:  # numba is optional: kernels still run, just uncompiled
+    def njit(*args, **kwargs):
+        # support both @njit and @njit(cache=True, ...)
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator